@@ -0,0 +1,49 @@
+"""
+Resources for the EPIC-OMOP vocabulary mapping analysis
+
+Submodules are imported the first time they (or one of their functions) are accessed, so
+`import Resources` is cheap and heavy dependencies (cryptography, sqlite3, pandas) are only
+loaded by the code paths that use them:
+
+    import Resources
+    Resources.analyze_mapping(...)        # loads Resources.analysis
+    from Resources.crypto import load_encrypted_dataframe
+"""
+import importlib
+
+_SUBMODULES = ["analysis", "coverage", "crypto", "datamanagement", "etl", "export", "sharedvocab", "snapshots", "validation", "vocab"]
+
+_EXPORTS = {
+    # crypto
+    "load_encrypted_dataframe":"crypto", "store_encrypted_dataframe":"crypto",
+    # vocab
+    "get_vocab_ids":"vocab", "get_list_from_column":"vocab", "append_concept_names":"vocab",
+    "append_sourceconcept_id":"vocab", "append_vocabulary_id":"vocab",
+    # analysis
+    "combine_exam_element_columns":"analysis", "combine_NAMEMATCH_value_columns":"analysis",
+    "set_compare":"analysis", "verify_disjoint":"analysis", "has_laterality":"analysis",
+    "filter_for_laterality_terms":"analysis", "expand_flags":"analysis", "analyze_mapping":"analysis",
+    "get_flag_matrix":"analysis", "categorize_mapping":"analysis", "rows_by_equiv_and_flag":"analysis",
+    "append_sourceel_names":"analysis", "append_sourceval_names":"analysis",
+    "append_sourceel_origindex":"analysis", "custom_filter":"analysis", "combine_analyse":"analysis",
+    "verify_sourceCode_aligned":"analysis", "code_reasons":"analysis",
+    # export
+    "extract_errors":"export", "parse_error_log":"export", "flag_error_rows":"export", "create_outdir":"export", "transform_mapping":"export", "export_stata":"export",
+    # datamanagement
+    "get_eldef":"datamanagement", "get_valdef":"datamanagement", "get_origindex":"datamanagement",
+    "valuedef_update":"datamanagement",
+}
+
+__all__ = _SUBMODULES + list(_EXPORTS)
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module("." + name, __name__)
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module("." + _EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,537 @@
+import re
+import numpy as np
+import pandas as pd
+from .datamanagement import get_eldef, get_valdef, get_origindex
+
+def combine_exam_element_columns(df: pd.DataFrame, combine_column_name="NAMEMATCH", examareacol=None, dataelementcol=None):
+    """
+    Creates the unique EPIC string name used for joining EPIC source elements with different CUIS
+    
+    Arguments:
+        df: pd.DataFrame
+            DataFrame with a column for exam area and a column for data element
+
+        combine_column_name: string, default "NAMEMATCH"
+            Name for the new column
+
+        examareacol: string, default None
+            If not provided, exam area column is automatically detected
+
+        dataelementcol: string, default None
+            If not provided, data element column is automatically detected        
+
+    Returns:
+        combined_df: pd.DataFrame
+            DataFrame with an additional row called NAMEMATCH (or combine_column_name if specified), that's a mashup of the exam area and data element columns
+    """
+    
+    if examareacol is None:
+        possible_names = ["Exam Area", "examArea", "ADD_INFO:Exam Area"]
+        for name in possible_names:
+            if name in df.columns:
+                examareacol = name
+                break
+    
+    if dataelementcol is None:
+        possible_names = ["Data Element", "dataElement", "ADD_INFO:Data Element"]
+        for name in possible_names:
+            if name in df.columns:
+                dataelementcol = name
+                break
+    
+    assert(examareacol is not None)
+    assert(dataelementcol is not None)
+
+    combined_df = df.copy(deep=True)
+
+    combined_df.loc[:,combine_column_name] = df[examareacol] + "-" + df[dataelementcol]
+
+    return combined_df
+
+def combine_NAMEMATCH_value_columns(df: pd.DataFrame, combine_column_name="VALSTRKEY"):
+    """
+    Creates the unique EPIC string name used for joining EPIC source elements with different CUIS
+    
+    Arguments:
+        df: pd.DataFrame
+            DataFrame with a column called "NAMEMATCH" and a column called "value"
+
+        combine_column_name: string
+            Name for the new column
+
+    Returns:
+        combined_df: pd.DataFrame
+            DataFrame with an additional row called VALSTRKEY (or combine_column_name if specified), that's a mashup of the exam area and data element columns
+    """
+    combined_df = df.copy(deep=True)
+
+    combined_df.loc[:,combine_column_name] = df["NAMEMATCH"] + "-" + df["value"]
+
+    return combined_df
+
+def set_compare(el_set1, el_set2):
+    """Lists some basic information about two element sets"""
+    print("Size of set 1: %d" % len(el_set1))
+    print("Size of set 2: %d" % len(el_set2))
+    print("Intersect size: %d" % len(el_set1 & el_set2))
+    print("Set 1 NOT set 2: %d" % len(el_set1 - el_set2))
+    print("Set 2 NOT set 1: %d" % len(el_set2 - el_set1))
+
+def verify_disjoint(set_list):
+    """Takes a list of sets and verifies that they're disjoint"""
+    union_length = len(set.union(*set_list))
+    sum_length = 0
+    for m_set in set_list:
+        sum_length += len(m_set)
+        
+    return sum_length == union_length
+
+def has_laterality(vals: pd.Series, side="right"):
+    right_reg_string = r"(?i)\bright\b"
+    left_reg_string = r"(?i)\bleft\b"
+    
+    assert (side=="left") or (side=="right")
+    if side=="right":
+        assert (~vals.str.contains(left_reg_string)).all()
+        return vals.str.contains(right_reg_string)
+    if side=="left":
+        assert (~vals.str.contains(right_reg_string)).all()
+        return vals.str.contains(left_reg_string)
+
+def filter_for_laterality_terms(vals: pd.Series, side="right"):
+    right_reg_string = r"(?i)\bright\b"
+    left_reg_string = r"(?i)\bleft\b"
+
+    assert (side=="left") or (side=="right")
+    if side=="right":
+        return vals.str.contains(right_reg_string)
+    if side=="left":
+        return vals.str.contains(left_reg_string)
+
+def expand_flags(df_in, exclusion_terms=["LOINC"]):
+
+    df_analyse = df_in.copy(deep=True)
+
+    flag_list = []
+    for index, row in df_analyse.iterrows():
+        ## Check that the equivalence rows are valid
+        assert row.equivalence in ["EQUAL", "WIDER", "NARROWER", "UNMATCHED"]
+
+        if type(row.comment) == str:
+            row_flags = re.findall(r"\b[A-Z]{5,}\b",row.comment)
+
+            # Remove any named things to exclude
+            for term in exclusion_terms:
+                try:
+                    row_flags.remove(term)
+                except ValueError:
+                    pass
+
+            
+            for val in row_flags:
+                if val not in flag_list:
+                    flag_list.append(val)
+                df_analyse.loc[index, val] = 1
+    df_analyse.loc[:, flag_list] = df_analyse.loc[:, flag_list].fillna(0).astype("int")
+
+    return df_analyse
+
+def analyze_mapping(df_in, exclusion_terms=["LOINC"], get_dict=True, print_vals=False, analysis_version=1):
+
+    df_analyse = df_in.copy(deep=True)
+    dict_out = {}
+
+    flag_list = []
+    for index, row in df_analyse.iterrows():
+        ## Check that the equivalence rows are valid
+        assert row.equivalence in ["EQUAL", "WIDER", "NARROWER", "UNMATCHED"]
+
+        if type(row.comment) == str:
+            row_flags = re.findall(r"\b[A-Z]{5,}\b",row.comment)
+
+            # Remove any named things to exclude
+            for term in exclusion_terms:
+                try:
+                    row_flags.remove(term)
+                except ValueError:
+                    pass
+
+            
+            for val in row_flags:
+                if val not in flag_list:
+                    flag_list.append(val)
+                df_analyse.loc[index, val] = 1
+
+    if print_vals: print("---COUNTS FOR EQUIVALENCE---")
+    dict_equiv = {}
+
+    df_equivcounts = df_analyse.equivalence.value_counts()
+    for equiv in ["EQUAL", "WIDER", "NARROWER", "UNMATCHED"]:
+        if print_vals: print(equiv, df_equivcounts.loc[equiv])
+        dict_equiv[equiv] = int(df_equivcounts.loc[equiv])
+
+    dict_out["equivalence"] = dict_equiv
+
+    if print_vals: print("")
+
+    if print_vals: print("---Flag counts for UNMAPPED---")
+    dict_unmapped = {}
+
+    # Switch based on update to analysis requested by CXC.
+    assert (analysis_version == 1) or (analysis_version == 2)
+
+    if analysis_version == 1:
+        try:
+            assert (df_analyse.loc[df_analyse.VALSMAPPED.notnull()].equivalence == "UNMATCHED").all()
+            count_VALSMAPPED = df_analyse.loc[df_analyse.VALSMAPPED.notnull()].shape[0]
+            if print_vals: print("VALSMAPPED: %d" % count_VALSMAPPED)
+            dict_unmapped["VALSMAPPED"] = int(count_VALSMAPPED)
+        except AttributeError:
+            pass
+
+        assert (df_analyse.loc[df_analyse.NOMATCH.notnull()].equivalence == "UNMATCHED").all()
+        count_NOMATCH = df_analyse.loc[df_analyse.NOMATCH.notnull()].shape[0]
+        if print_vals: print("NOMATCH: %d" % count_NOMATCH)
+        dict_unmapped["NOMATCH"] = int(count_NOMATCH)
+
+        try:
+            assert (df_analyse.loc[df_analyse.INDIRECT.notnull()].equivalence == "UNMATCHED").all()
+            count_INDIRECT = df_analyse.loc[df_analyse.INDIRECT.notnull()].shape[0]
+            if print_vals: print("INDIRECT: %d" % count_INDIRECT)
+            dict_unmapped["INDIRECT"] = int(count_INDIRECT)
+        except AttributeError:
+            pass
+
+        assert (df_analyse.loc[df_analyse.SUBFIELD.notnull()].equivalence == "UNMATCHED").all()
+        count_SUBFIELD = df_analyse.loc[df_analyse.SUBFIELD.notnull()].shape[0]
+        if print_vals: print("SUBFIELD: %d" % count_SUBFIELD)
+        dict_unmapped["SUBFIELD"] = int(count_SUBFIELD)
+
+        dict_out["unmapped"] = dict_unmapped
+
+    if analysis_version == 2:
+
+        ## Collect the counts for 'OTHER'
+        dict_unmapped["OTHER"] = 0
+
+        try:
+            assert (df_analyse.loc[df_analyse.VALSMAPPED.notnull()].equivalence == "UNMATCHED").all()
+            count_VALSMAPPED = df_analyse.loc[df_analyse.VALSMAPPED.notnull()].shape[0]
+            if print_vals: print("VALSMAPPED: %d" % count_VALSMAPPED)
+            dict_unmapped["OTHER"] += int(count_VALSMAPPED)
+        except AttributeError:
+            pass
+        try:
+            assert (df_analyse.loc[df_analyse.INDIRECT.notnull()].equivalence == "UNMATCHED").all()
+            count_INDIRECT = df_analyse.loc[df_analyse.INDIRECT.notnull()].shape[0]
+            if print_vals: print("INDIRECT: %d" % count_INDIRECT)
+            dict_unmapped["OTHER"] += int(count_INDIRECT)
+        except AttributeError:
+            pass
+        try:
+            assert (df_analyse.loc[df_analyse.SUBFIELD.notnull()].equivalence == "UNMATCHED").all()
+            count_SUBFIELD = df_analyse.loc[df_analyse.SUBFIELD.notnull()].shape[0]
+            if print_vals: print("SUBFIELD: %d" % count_SUBFIELD)
+            dict_unmapped["OTHER"] += int(count_SUBFIELD)
+        except AttributeError:
+            pass
+
+        isother_element_filter = append_sourceel_names(df_analyse).dataElement.isin(["Comments", "Users"])
+
+        df_analyse.loc[isother_element_filter].shape[0]
+
+        # Handle the NOMATCH, splitting out the COMMENTS and USERS
+        assert (df_analyse.loc[df_analyse.NOMATCH.notnull()].equivalence == "UNMATCHED").all()
+        count_NOMATCH_ISOTHER_FILTERED = df_analyse.loc[df_analyse.NOMATCH.notnull() & isother_element_filter].shape[0]
+        count_NOMATCH = df_analyse.loc[df_analyse.NOMATCH.notnull() & ~isother_element_filter].shape[0]
+        assert df_analyse.loc[df_analyse.NOMATCH.notnull()].shape[0] == (count_NOMATCH_ISOTHER_FILTERED + count_NOMATCH)
+        if print_vals: print("NOMATCH: %d" % count_NOMATCH)
+        dict_unmapped["OTHER"] += int(count_NOMATCH_ISOTHER_FILTERED)
+        dict_unmapped["NOMATCH"] = int(count_NOMATCH)
+
+        dict_out["unmapped"] = dict_unmapped
+
+    if print_vals: print("")
+
+    if print_vals: print("---Flag counts for WIDER---")
+
+    dict_wider = {}
+
+    assert (df_analyse.loc[df_analyse.LATERALITY.notnull()].equivalence == "WIDER").all()
+    count_LATERALITY = df_analyse.loc[df_analyse.LATERALITY.notnull() & df_analyse.CONCEPTMISSING.isnull()].shape[0]
+    if print_vals: print("LATERALITY: %d" % count_LATERALITY)
+    dict_wider["LATERALITY"] = int(count_LATERALITY)
+
+    assert (df_analyse.loc[df_analyse.CONCEPTMISSING.notnull()].equivalence == "WIDER").all()
+    count_CONCEPTMISSING = df_analyse.loc[df_analyse.CONCEPTMISSING.notnull() & df_analyse.LATERALITY.isnull()].shape[0]
+    if print_vals: print("CONCEPTMISSING: %d" % count_CONCEPTMISSING)
+    dict_wider["CONCEPTMISSING"] = int(count_CONCEPTMISSING)
+
+    count_CONCEPTMISSINGandLATERALITY = df_analyse.loc[df_analyse.CONCEPTMISSING.notnull() & df_analyse.LATERALITY.notnull()].shape[0]
+    if print_vals: print("CONCEPTMISSING&LATERALITY: %d" % count_CONCEPTMISSINGandLATERALITY)
+    dict_wider["CONCEPTMISSING&LATERALITY"] = int(count_CONCEPTMISSINGandLATERALITY)
+
+    dict_out["wider"] = dict_wider
+
+    if get_dict:
+        return dict_out
+
+def get_flag_matrix(df_in, exclusion_terms=["LOINC"]):
+    """
+    Vectorized version of the flag parsing in expand_flags()
+
+    Arguments:
+        df_in: pd.DataFrame
+            Mapping DataFrame with a comment column
+
+        exclusion_terms: list, default ["LOINC"]
+            Upper-case terms in the comments that are not flags
+
+    Returns:
+        df_flags: pd.DataFrame
+            0/1 int matrix with one column per flag, aligned to df_in's index
+    """
+    sr_flags = df_in.comment.astype("object").str.findall(r"\b[A-Z]{5,}\b").explode()
+    sr_flags = sr_flags.loc[sr_flags.notna() & ~sr_flags.isin(exclusion_terms)]
+    if sr_flags.empty:
+        return pd.DataFrame(index=df_in.index)
+
+    df_flags = pd.crosstab(sr_flags.index, sr_flags).clip(upper=1)\
+        .reindex(df_in.index, fill_value=0).astype("int")
+    df_flags.columns.name = None
+    df_flags.index.name = df_in.index.name
+    return df_flags
+
+def categorize_mapping(df_in, df_type=None, exclusion_terms=["LOINC"]):
+    """
+    Per-row version of the analyze_mapping() (analysis_version=2) buckets
+
+    analyze_mapping() counts each unmatched flag separately, so a row flagged "NOMATCH VALSMAPPED"
+    adds to both NOMATCH and OTHER. n_other and n_nomatch hold each row's contribution to those
+    counts, and are what summarize_categories() and weighted_analyze_mapping() add up. The
+    "unmapped" column is a single label per row for display: OTHER takes precedence over NOMATCH
+
+    Arguments:
+        df_in: pd.DataFrame
+            Mapping DataFrame (sourceCode, equivalence, conceptId, comment)
+
+        df_type: str
+            'element' or 'value'. Comments/Users elements are bucketed as OTHER for element maps
+
+        exclusion_terms: list, default ["LOINC"]
+            Upper-case terms in the comments that are not flags
+
+    Returns:
+        df_cat: pd.DataFrame
+            DataFrame aligned to df_in with the equivalence, "unmapped" and "wider" categories
+            (the latter two are null where they don't apply), and the n_other and n_nomatch counts
+    """
+    if df_type not in ['element', 'value']:
+        raise ValueError("Invalid/no dataframe type given: please specify \'element\' or \'value\'")
+
+    assert df_in.equivalence.isin(["EQUAL", "WIDER", "NARROWER", "UNMATCHED"]).all()
+
+    df_flags = get_flag_matrix(df_in, exclusion_terms=exclusion_terms)
+    def flag(name):
+        if name in df_flags.columns:
+            return df_flags[name].to_numpy() == 1
+        return np.zeros(df_in.shape[0], dtype="bool")
+
+    if df_type == 'element':
+        isother_element = append_sourceel_names(df_in).dataElement.isin(["Comments", "Users"]).to_numpy()
+    else:
+        isother_element = np.zeros(df_in.shape[0], dtype="bool")
+
+    is_unmatched = (df_in.equivalence == "UNMATCHED").to_numpy()
+    is_wider = (df_in.equivalence == "WIDER").to_numpy()
+
+    unmapped = np.select(
+        [is_unmatched & (flag("VALSMAPPED") | flag("INDIRECT") | flag("SUBFIELD")),
+         is_unmatched & flag("NOMATCH") & isother_element,
+         is_unmatched & flag("NOMATCH")],
+        ["OTHER", "OTHER", "NOMATCH"], default=None)
+
+    wider = np.select(
+        [is_wider & flag("LATERALITY") & flag("CONCEPTMISSING"),
+         is_wider & flag("LATERALITY"),
+         is_wider & flag("CONCEPTMISSING")],
+        ["CONCEPTMISSING&LATERALITY", "LATERALITY", "CONCEPTMISSING"], default=None)
+
+    n_other = is_unmatched * (flag("VALSMAPPED").astype("int64") + flag("INDIRECT") + flag("SUBFIELD") \
+        + (flag("NOMATCH") & isother_element))
+    n_nomatch = is_unmatched * (flag("NOMATCH") & ~isother_element)
+
+    return pd.DataFrame({"equivalence":df_in.equivalence, "unmapped":unmapped, "wider":wider,
+        "n_other":n_other, "n_nomatch":n_nomatch}, index=df_in.index)\
+        .astype({"equivalence":"string", "unmapped":"string", "wider":"string", "n_other":"int64", "n_nomatch":"int64"})
+
+# Stata codes used by Stata/DoFile.do (equivlbl, equivlbl2, widerlbl, unmatchedlbl, typelbl)
+STATA_VALUE_LABELS = {
+    "type": {0:"Element", 1:"Values"},
+    "equivalence": {0:"EQUAL", 1:"WIDER", 2:"NARROWER", 3:"UNMATCHED"},
+    "equivalence_2": {0:"EQUAL", 1:"NOT EQUAL"},
+    "widerreason": {1:"LATERALITY", 2:"CONCEPTMISSING", 3:"BOTH"},
+    "unmatchedreason": {1:"NOMATCH", 2:"VALSMAPPED", 3:"INDIRECT", 4:"SUBFIELD"},
+}
+STATA_FLAGS = ["NOMATCH", "VALSMAPPED", "INDIRECT", "SUBFIELD", "LATERALITY", "CONCEPTMISSING"]
+
+def code_reasons(dict_maps, reviewers=["cc", "sb", "consensus", "wh"], exclusion_terms=["LOINC"]):
+    """
+    Derive the Stata reason-coding variables for every reviewer at once
+
+    Computes what the encode/replace loops in Stata/DoFile.do do for each reviewer x:
+    equivalence_x (0-3), equivalence_2_x (0 EQUAL, 1 NOT EQUAL), the 0/1 flag columns,
+    widerreason_x (WIDER rows only) and unmatchedreason_x (UNMATCHED rows only). Where an
+    UNMATCHED row has several flags, the last replace in the do-file wins (SUBFIELD > INDIRECT >
+    VALSMAPPED > NOMATCH), and that order is kept here.
+
+    Arguments:
+        dict_maps: dict
+            Maps a reviewer label to its (element mapping, value mapping) DataFrames,
+            e.g. {"cc":(df_el_cc, df_val_cc), "consensus":(df_el_consensus, df_val_consensus)}
+
+        reviewers: list, default ["cc", "sb", "consensus", "wh"]
+            Reviewer labels (used as column suffixes), in output order
+
+        exclusion_terms: list, default ["LOINC"]
+            Upper-case terms in the comments that are not flags
+
+    Returns:
+        df_coded: pd.DataFrame
+            One row per element then value mapping row, with type, sourcecode and the coded
+            columns for each reviewer. Missing codes are NaN (Stata missing)
+    """
+    equiv_codes = {label:code for code, label in STATA_VALUE_LABELS["equivalence"].items()}
+
+    df_el_ref, df_val_ref = dict_maps[reviewers[0]]
+    df_coded = pd.DataFrame({
+        "type": np.repeat([0, 1], [df_el_ref.shape[0], df_val_ref.shape[0]]),
+        "sourcecode": np.concatenate([df_el_ref.sourceCode.astype("string").to_numpy(), df_val_ref.sourceCode.astype("string").to_numpy()]),
+    })
+
+    for x in reviewers:
+        df_el, df_val = dict_maps[x]
+        verify_sourceCode_aligned(df_el_ref, df_el)
+        verify_sourceCode_aligned(df_val_ref, df_val)
+        df_map = pd.concat([df_el, df_val], ignore_index=True)
+
+        equivalence = df_map.equivalence.map(equiv_codes).to_numpy(dtype="float")
+        df_flags = get_flag_matrix(df_map, exclusion_terms=exclusion_terms).reindex(columns=STATA_FLAGS, fill_value=0)
+        flags = {flag.lower():df_flags[flag].to_numpy() == 1 for flag in STATA_FLAGS}
+
+        is_wider = equivalence == 1
+        is_unmatched = equivalence == 3
+
+        df_coded["equivalence_" + x] = equivalence
+        df_coded["equivalence_2_" + x] = np.where(np.isnan(equivalence), np.nan, (equivalence > 0).astype("float"))
+        df_coded["conceptid_" + x] = df_map.conceptId.astype("Int64").to_numpy(dtype="float", na_value=np.nan)
+        for flag in flags:
+            df_coded[flag + "_" + x] = flags[flag].astype("int8")
+
+        df_coded["widerreason_" + x] = np.select(
+            [is_wider & flags["laterality"] & flags["conceptmissing"],
+             is_wider & flags["laterality"],
+             is_wider & flags["conceptmissing"],
+             is_wider],
+            [3, 1, 2, 0], default=np.nan)
+
+        df_coded["unmatchedreason_" + x] = np.select(
+            [is_unmatched & flags["subfield"],
+             is_unmatched & flags["indirect"],
+             is_unmatched & flags["valsmapped"],
+             is_unmatched & flags["nomatch"],
+             is_unmatched],
+            [4, 3, 2, 1, 0], default=np.nan)
+
+    return df_coded
+
+def rows_by_equiv_and_flag(df_in, flag_term, equiv_term):
+    df_analyse = df_in.copy(deep=True)
+
+    for index, row in df_analyse.iterrows():
+        ## Check that the equivalence rows are valid
+        assert row.equivalence in ["EQUAL", "WIDER", "NARROWER", "UNMATCHED"]
+
+        if type(row.comment) == str:
+            row_flags = re.findall(r"\b[A-Z]{5,}\b",row.comment)
+            
+            if flag_term in row_flags:
+                df_analyse.loc[index, flag_term] = True
+            else:
+                df_analyse.loc[index, flag_term] = False
+        else:
+            df_analyse.loc[index, flag_term] = False
+        
+    return df_analyse.loc[df_analyse[flag_term] & (df_analyse.equivalence == equiv_term)]
+
+def append_sourceel_names(df_in: pd.DataFrame, sourcecode_colname="sourceCode", sourcecode_outcolname="sourceCode"):
+
+    df = df_in.copy(deep=True)
+    df.rename(columns={sourcecode_colname:sourcecode_outcolname}, inplace=True)
+
+    df_eldef = get_eldef(); 
+    assert df_eldef.CUI.is_unique
+    df_eldef.rename(columns={"CUI":sourcecode_outcolname}, inplace=True)
+
+    return df.merge(df_eldef, on=sourcecode_outcolname, how="left")
+
+def append_sourceval_names(df_in: pd.DataFrame, sourcecode_colname="sourceCode"):
+
+    df = df_in.copy(deep=True)
+    df.rename(columns={sourcecode_colname:"sourceCode"}, inplace=True)
+
+    df_valdef = get_valdef(); 
+    assert df_valdef.ID.is_unique
+    df_valdef.rename(columns={"ID":"sourceCode"}, inplace=True)
+
+    return append_sourceel_names(df.merge(df_valdef, on="sourceCode", how="left"), sourcecode_colname="CUI", sourcecode_outcolname="CUI")
+
+def append_sourceel_origindex(df_in: pd.DataFrame, sourcecode_colname="sourceCode", sourcecode_outcolname=None):
+    if sourcecode_outcolname is None:
+        sourcecode_outcolname = sourcecode_colname
+
+    df = df_in.copy(deep=True)
+    df.rename(columns={sourcecode_colname:sourcecode_outcolname}, inplace=True)
+    
+    df_origindex = get_origindex()
+    assert df_origindex.CUI.is_unique
+    df_origindex.rename(columns={"CUI":sourcecode_outcolname}, inplace=True)
+
+    return df.merge(df_origindex, on=sourcecode_outcolname, how="left")
+
+def custom_filter(tuple_dfs: tuple, df_type=None):
+    exclusion_examArea = ["Strabismus", "Contact Lens Current Rx", \
+    "Contact Lens History", "Contact Lens Final Rx", "Contact Lens"]
+    
+    ret_tuple = ()
+    if df_type not in ['element', 'value']:
+            raise ValueError("Invalid/no dataframe type given: please specify \'element\' or \'value\'")
+    for i, df in enumerate(tuple_dfs):
+        match df_type:
+            case 'element':
+                expanded_df = append_sourceel_names(df)
+            case 'value':
+                expanded_df = append_sourceval_names(df)
+
+        df_slice = df.loc[~expanded_df.examArea.isin(exclusion_examArea)]
+        ret_tuple = (*ret_tuple, df_slice.copy(deep=True))
+    return ret_tuple
+
+def combine_analyse(eldict, valdict):
+    outdict = {}
+    for key1 in eldict:
+        outdict[key1] = {}
+        for key2 in eldict[key1]:
+            if key2 in valdict[key1].keys():
+                outdict[key1][key2] = eldict[key1][key2] + valdict[key1][key2]
+            else:
+                outdict[key1][key2] = eldict[key1][key2]
+    return outdict
+
+def verify_sourceCode_aligned(df1=None, df2=None):
+    if (df1 is None) and (df2 is None):
+        global df_el_sb, df_el_cc, df_val_sb, df_val_cc
+        assert df_el_sb.sourceCode.equals(df_el_cc.sourceCode)
+        assert df_val_sb.sourceCode.equals(df_val_cc.sourceCode)
+    else:
+        assert df1.sourceCode.equals(df2.sourceCode)
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+from .datamanagement import get_eldef
+from .analysis import categorize_mapping, append_sourceel_names, append_sourceval_names
+
+def count_exam_usage(chunks, print_vals=False):
+    """
+    Count how often each element CUI and value ID occurs in the patient exam records, in a single pass
+
+    CUIs are coded against the element definitions and counted with np.bincount, so the running
+    state is two integer arrays regardless of how many records are streamed.
+
+    Arguments:
+        chunks: iterable of pd.DataFrame
+            Exam record chunks with CUI and value_id columns, e.g. from etl.iter_exam_records()
+
+        print_vals: bool, default False
+            Print a running record count per chunk
+
+    Returns:
+        el_counts: pd.Series
+            Occurrence count per element CUI (indexed by CUI)
+
+        val_counts: pd.Series
+            Occurrence count per value ID (indexed by ID)
+
+        n_unknown: int
+            Number of records whose CUI is not in the element definitions
+
+        n_unknown_values: int
+            Number of records with a negative value_id, which (as in etl.run_etl()) aren't counted
+    """
+    df_eldef = get_eldef(); assert df_eldef.CUI.is_unique
+    cuis = pd.Index(df_eldef.CUI.astype("object"))
+
+    el_counts = np.zeros(len(cuis), dtype="int64")
+    val_counts = np.zeros(0, dtype="int64")
+    n_unknown = 0
+    n_unknown_values = 0
+    n_rows = 0
+
+    for chunk in chunks:
+        codes = cuis.get_indexer(chunk.CUI.astype("object"))
+        n_unknown += int((codes < 0).sum())
+        el_counts += np.bincount(codes[codes >= 0], minlength=len(cuis))
+
+        val_ids = chunk.value_id.dropna().to_numpy(dtype="int64")
+        n_unknown_values += int((val_ids < 0).sum())
+        val_ids = val_ids[val_ids >= 0]
+        if len(val_ids):
+            chunk_counts = np.bincount(val_ids)
+            if len(chunk_counts) > len(val_counts):
+                val_counts = np.pad(val_counts, (0, len(chunk_counts) - len(val_counts)))
+            val_counts[:len(chunk_counts)] += chunk_counts
+
+        n_rows += chunk.shape[0]
+        if print_vals: print("Counted %d records" % n_rows)
+
+    el_counts = pd.Series(el_counts, index=cuis.rename("CUI"), name="count")
+    val_counts = pd.Series(val_counts, index=pd.RangeIndex(len(val_counts), name="ID"), name="count")
+
+    return el_counts.loc[el_counts > 0], val_counts.loc[val_counts > 0], n_unknown, n_unknown_values
+
+def weighted_analyze_mapping(df_in, counts, df_type=None):
+    """
+    Usage-weighted version of analyze_mapping() (analysis_version=2)
+
+    Each mapping row is weighted by the number of patient records that use its sourceCode,
+    rather than counting every definition once. The output has the same shape as
+    analyze_mapping(), so it can be passed to combine_analyse() and the Sankey code.
+
+    Arguments:
+        df_in: pd.DataFrame
+            Mapping DataFrame (sourceCode, equivalence, conceptId, comment)
+
+        counts: pd.Series
+            Occurrence counts indexed by sourceCode, from count_exam_usage()
+
+        df_type: str
+            'element' or 'value'
+
+    Returns:
+        dict_out: dict
+            Weighted counts under "equivalence", "unmapped" and "wider"
+    """
+    df_cat = categorize_mapping(df_in, df_type=df_type)
+    df_cat["count"] = df_in.sourceCode.map(counts).fillna(0).astype("int64")
+
+    dict_out = {}
+    sr_equiv = df_cat.groupby("equivalence")["count"].sum()
+    dict_out["equivalence"] = {equiv:int(sr_equiv.get(equiv, 0)) for equiv in ["EQUAL", "WIDER", "NARROWER", "UNMATCHED"]}
+
+    # Flag counts, as analyze_mapping() (a row with several unmatched flags counts towards each)
+    dict_out["unmapped"] = {"OTHER":int((df_cat.n_other * df_cat["count"]).sum()),
+        "NOMATCH":int((df_cat.n_nomatch * df_cat["count"]).sum())}
+
+    sr_wider = df_cat.groupby("wider")["count"].sum()
+    dict_out["wider"] = {flag:int(sr_wider.get(flag, 0)) for flag in ["LATERALITY", "CONCEPTMISSING", "CONCEPTMISSING&LATERALITY"]}
+
+    return dict_out
+
+def highest_impact_unmapped(df_in, counts, df_type=None, equivalence=["UNMATCHED", "WIDER"], n=50):
+    """
+    Rank mapping rows that aren't fully mapped by how many patient records they affect
+
+    Arguments:
+        df_in: pd.DataFrame
+            Mapping DataFrame (sourceCode, equivalence, conceptId, comment)
+
+        counts: pd.Series
+            Occurrence counts indexed by sourceCode, from count_exam_usage()
+
+        df_type: str
+            'element' or 'value'
+
+        equivalence: list, default ["UNMATCHED", "WIDER"]
+            Equivalence values to include in the ranking
+
+        n: int, default 50
+            Number of rows to return (None for all)
+
+    Returns:
+        df_ranked: pd.DataFrame
+            Rows sorted by descending count, with source names, category and share of all records
+    """
+    df_cat = categorize_mapping(df_in, df_type=df_type)
+    df_ranked = df_in[["sourceCode", "conceptId"]].join(df_cat)
+    df_ranked["count"] = df_in.sourceCode.map(counts).fillna(0).astype("int64")
+    df_ranked["% of records"] = df_ranked["count"] / counts.sum()
+
+    df_ranked = df_ranked.loc[df_ranked.equivalence.isin(equivalence)]\
+        .sort_values("count", ascending=False)
+    if n is not None:
+        df_ranked = df_ranked.head(n)
+
+    if df_type == 'element':
+        df_ranked = append_sourceel_names(df_ranked)
+    else:
+        df_ranked = append_sourceval_names(df_ranked)
+
+    return df_ranked.reset_index(drop=True)
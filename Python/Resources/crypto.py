@@ -0,0 +1,89 @@
+import base64
+import pickle
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+def load_encrypted_dataframe(path, password):
+    """
+    Load a pandas DataFrame from one encrypted using store_encrypted_dataframe()
+
+    Arguments:
+        path: str
+            Path to the encrypted DataFrame
+
+        password: str
+            Password to the encrypted DataFrame
+
+    Returns:
+        data: pd.DataFrame
+            Un-encrypted pandas DataFrame
+    """
+    # Create a password
+    pwd_bytes = bytes(password, 'utf-8')
+
+    # Get the salt
+    with open("TestData/PatData/salt.txt", 'r') as f:
+        line = f.readline()
+        m_salt = bytes.fromhex(line)
+
+    # Hash the salt and password to get the key
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=m_salt,
+        iterations=390000,
+    )
+    key = base64.urlsafe_b64encode(kdf.derive(pwd_bytes))
+
+    # Create the fernet object
+    fernet = Fernet(key)
+
+    # Load the encrypted file
+    with open(path, 'rb') as encrypted_file:
+        encrypted = encrypted_file.read()
+ 
+    # Decrypt the file
+    try:
+        return pickle.loads(fernet.decrypt(encrypted))
+    except InvalidToken:
+        raise(ValueError("Incorrect password"))
+    
+
+def store_encrypted_dataframe(df, path, password):
+    """
+    Takes a pandas DataFrame and stores it in an encrypted pickle
+
+    Arguments:
+        df: pd.DataFrame
+            The pandas DataFrame to be stored
+
+        path: str
+            Path to where the DataFrame should be stored
+
+        password: str
+            Password to the encrypted DataFrame
+        
+    Returns:
+        data: pd.DataFrame
+            Un-encrypted pandas DataFrame
+    """
+    # Create a password
+    pwd_bytes = bytes(password, 'utf-8')
+    # Get the salt
+    with open("TestData/PatData/salt.txt", 'r') as f:
+        salt = f.readline()
+    # Hash the salt and password to get the 
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=bytes.fromhex(salt),
+        iterations=390000,
+    )
+    key = base64.urlsafe_b64encode(kdf.derive(pwd_bytes))
+    fernet = Fernet(key)
+
+    my_pickle = pickle.dumps(df)
+    encrypted = fernet.encrypt(my_pickle)
+    with open(path, "wb") as encrypted_file:
+        encrypted_file.write(encrypted)
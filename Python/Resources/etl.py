@@ -0,0 +1,257 @@
+import os
+import time
+import multiprocessing
+import numpy as np
+import pandas as pd
+from .datamanagement import get_eldef
+
+# Equivalence values that carry a usable conceptId into the OMOP tables (UNMATCHED rows map to concept 0)
+MAPPED_EQUIVALENCE = ["EQUAL", "WIDER", "NARROWER"]
+
+# Columns expected in the patient exam records
+EXAM_COLUMNS = ["person_id", "exam_datetime", "CUI", "value_id", "value"]
+EXAM_DTYPES = {"person_id":"int64", "exam_datetime":"string", "CUI":"string", "value_id":"Int64", "value":"string"}
+
+OBSERVATION_COLUMNS = ["person_id", "observation_concept_id", "observation_date", "observation_datetime", \
+    "value_as_concept_id", "value_as_string", "observation_source_value", "value_source_value"]
+MEASUREMENT_COLUMNS = ["person_id", "measurement_concept_id", "measurement_date", "measurement_datetime", \
+    "value_as_concept_id", "value_as_number", "measurement_source_value", "value_source_value"]
+
+# Per-process copy of the compiled lookup, set by _init_worker()
+_LOOKUP = None
+
+def get_concept_domains(concept_ids, resource_db_path=r"Resources\resource.db"):
+    """
+    Get the OMOP domain_id for a list of concept IDs
+
+    Arguments:
+        concept_ids: list-like
+            The concept IDs to look up
+
+        resource_db_path: str, default r"Resources\\resource.db"
+            Path to the sqlite database holding the OMOP concept table
+
+    Returns:
+        domains: pd.Series
+            Series of domain_id indexed by concept_id
+    """
+    import sqlite3
+
+    sqliteConnection = sqlite3.connect(resource_db_path)
+    cursor = sqliteConnection.cursor()
+
+    pd.DataFrame({"conceptId":pd.unique(np.asarray(concept_ids, dtype="int64"))})\
+        .to_sql(name="concept_id_temp_table", con=sqliteConnection, if_exists="replace", index=False)
+
+    m_query = """
+    SELECT concept_id, domain_id
+    FROM concept
+    WHERE concept_id IN (SELECT conceptId FROM concept_id_temp_table)
+    """
+    df_domains = pd.read_sql(m_query, con=sqliteConnection).astype({"concept_id":"int64", "domain_id":"string"})
+
+    cursor.execute("DROP TABLE concept_id_temp_table")
+    sqliteConnection.close()
+
+    return df_domains.set_index("concept_id").domain_id
+
+def compile_mapping_lookup(df_el_map, df_val_map, domains=None, resource_db_path=r"Resources\resource.db"):
+    """
+    Compile the consensus element and value maps into dense arrays for the ETL
+
+    Element CUIs are given integer codes from the element definitions, so both lookups are plain
+    array indexing (code -> conceptId, value ID -> conceptId). Unmapped codes hold concept 0.
+
+    Arguments:
+        df_el_map: pd.DataFrame
+            Element mapping (sourceCode, equivalence, conceptId), e.g. the CONS element map
+
+        df_val_map: pd.DataFrame
+            Value mapping (sourceCode, equivalence, conceptId), e.g. the CONS value map
+
+        domains: pd.Series, default None
+            domain_id indexed by concept_id. If not provided, looked up in resource.db
+
+        resource_db_path: str, default r"Resources\\resource.db"
+            Path to the sqlite database holding the OMOP concept table
+
+    Returns:
+        lookup: dict
+            "cuis": pd.Index of element CUIs (position is the integer code)
+            "el_concept": np.ndarray of element conceptIds by code
+            "el_measurement": np.ndarray, True where the element concept is in the Measurement domain
+            "val_concept": np.ndarray of value conceptIds by value ID
+    """
+    df_eldef = get_eldef(); assert df_eldef.CUI.is_unique
+
+    df_el = df_el_map.loc[df_el_map.equivalence.isin(MAPPED_EQUIVALENCE) & df_el_map.conceptId.notna()]
+    df_val = df_val_map.loc[df_val_map.equivalence.isin(MAPPED_EQUIVALENCE) & df_val_map.conceptId.notna()]
+    assert df_el.sourceCode.is_unique
+    assert df_val.sourceCode.is_unique
+
+    # Elements: CUI -> integer code -> conceptId
+    cuis = pd.Index(df_eldef.CUI.astype("object").unique())
+    el_codes = cuis.get_indexer(df_el.sourceCode.astype("object"))
+    if (el_codes < 0).any():
+        raise ValueError("Element map contains sourceCode values missing from the element definitions")
+    el_concept = np.zeros(len(cuis), dtype="int64")
+    el_concept[el_codes] = df_el.conceptId.to_numpy(dtype="int64")
+
+    # Values: value ID -> conceptId
+    val_ids = df_val.sourceCode.to_numpy(dtype="int64")
+    val_concept = np.zeros(int(val_ids.max()) + 1 if len(val_ids) else 0, dtype="int64")
+    val_concept[val_ids] = df_val.conceptId.to_numpy(dtype="int64")
+
+    # Route each element to OBSERVATION or MEASUREMENT based on its concept domain
+    if domains is None:
+        domains = get_concept_domains(el_concept[el_concept > 0], resource_db_path=resource_db_path)
+    el_measurement = pd.Series(el_concept).map(domains).eq("Measurement").fillna(False).to_numpy(dtype="bool")
+
+    return {"cuis":cuis, "el_concept":el_concept, "el_measurement":el_measurement, "val_concept":val_concept}
+
+def iter_exam_records(path, password=None, chunksize=500000):
+    """
+    Stream patient exam records in chunks
+
+    Arguments:
+        path: str
+            Path to a csv of exam records, or to a store written by store_encrypted_dataframe()
+
+        password: str, default None
+            Password for an encrypted store. If None, path is read as a csv
+
+        chunksize: int, default 500000
+            Number of records per chunk
+
+    Returns:
+        chunks: generator of pd.DataFrame
+    """
+    if password is None:
+        for chunk in pd.read_csv(path, usecols=EXAM_COLUMNS, dtype=EXAM_DTYPES, chunksize=chunksize):
+            yield chunk
+    else:
+        from .crypto import load_encrypted_dataframe
+
+        # Fernet decrypts the whole token at once, so the store is held in memory and sliced
+        df = load_encrypted_dataframe(path, password)[EXAM_COLUMNS].astype(EXAM_DTYPES)
+        for start in range(0, df.shape[0], chunksize):
+            yield df.iloc[start:start + chunksize]
+
+def _init_worker(lookup):
+    global _LOOKUP
+    _LOOKUP = lookup
+
+def _map_chunk(df):
+    lookup = _LOOKUP
+
+    # Element concepts (unknown CUIs get code -1 -> concept 0)
+    codes = lookup["cuis"].get_indexer(df.CUI.astype("object"))
+    known = codes >= 0
+    el_concept = np.where(known, lookup["el_concept"][codes], 0)
+    is_measurement = known & lookup["el_measurement"][codes]
+
+    # Value concepts (free text or unknown IDs -> concept 0)
+    val_concept = lookup["val_concept"]
+    val_ids = df.value_id.fillna(-1).to_numpy(dtype="int64")
+    val_known = (val_ids >= 0) & (val_ids < len(val_concept))
+    value_concept = np.zeros(len(val_ids), dtype="int64")
+    value_concept[val_known] = val_concept[val_ids[val_known]]
+
+    # observation_date/measurement_date are required, so rows without a parseable datetime are dropped (and counted)
+    exam_datetime = pd.to_datetime(df.exam_datetime, errors="coerce")
+    has_date = exam_datetime.notna().to_numpy(dtype="bool")
+    is_measurement = is_measurement & has_date
+
+    person_id = df.person_id.to_numpy()
+    cui = df.CUI.to_numpy()
+    value = df.value.to_numpy()
+
+    obs = ~is_measurement & has_date
+    df_obs = pd.DataFrame({
+        "person_id": person_id[obs],
+        "observation_concept_id": el_concept[obs],
+        "observation_date": exam_datetime[obs].dt.date.to_numpy(),
+        "observation_datetime": exam_datetime[obs].to_numpy(),
+        "value_as_concept_id": value_concept[obs],
+        "value_as_string": value[obs],
+        "observation_source_value": cui[obs],
+        "value_source_value": value[obs]
+    })[OBSERVATION_COLUMNS]
+
+    df_meas = pd.DataFrame({
+        "person_id": person_id[is_measurement],
+        "measurement_concept_id": el_concept[is_measurement],
+        "measurement_date": exam_datetime[is_measurement].dt.date.to_numpy(),
+        "measurement_datetime": exam_datetime[is_measurement].to_numpy(),
+        "value_as_concept_id": value_concept[is_measurement],
+        "value_as_number": pd.to_numeric(df.value[is_measurement], errors="coerce").to_numpy(),
+        "measurement_source_value": cui[is_measurement],
+        "value_source_value": value[is_measurement]
+    })[MEASUREMENT_COLUMNS]
+
+    return df_obs, df_meas, int((~has_date).sum())
+
+def run_etl(chunks, lookup, outdir, n_workers=None, print_vals=True):
+    """
+    Map streamed exam records to OMOP OBSERVATION and MEASUREMENT rows
+
+    Each chunk is split across a worker pool and the results are appended to
+    OBSERVATION.csv and MEASUREMENT.csv in outdir, so memory is bounded by the chunk size.
+
+    Arguments:
+        chunks: iterable of pd.DataFrame
+            Exam record chunks, e.g. from iter_exam_records()
+
+        lookup: dict
+            Compiled lookup from compile_mapping_lookup()
+
+        outdir: str
+            Directory to write the OMOP tables to
+
+        n_workers: int, default None
+            Number of worker processes. Defaults to os.cpu_count()
+
+        print_vals: bool, default True
+            Print per-chunk throughput
+
+    Returns:
+        stats: dict
+            Row counts, elapsed seconds and rows per second. Records whose exam_datetime can't be
+            parsed are not written (the OMOP date columns are required), and are counted in rows_bad_date
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count()
+
+    os.makedirs(outdir, exist_ok=True)
+    obs_path = os.path.join(outdir, "OBSERVATION.csv")
+    meas_path = os.path.join(outdir, "MEASUREMENT.csv")
+    pd.DataFrame(columns=OBSERVATION_COLUMNS).to_csv(obs_path, index=False)
+    pd.DataFrame(columns=MEASUREMENT_COLUMNS).to_csv(meas_path, index=False)
+
+    stats = {"chunks":0, "rows_in":0, "observation_rows":0, "measurement_rows":0, "rows_bad_date":0}
+    start = time.perf_counter()
+
+    with multiprocessing.Pool(n_workers, initializer=_init_worker, initargs=(lookup,)) as pool:
+        for chunk in chunks:
+            chunk_start = time.perf_counter()
+            n_parts = max(1, min(n_workers, chunk.shape[0]))
+            parts = [chunk.iloc[idx] for idx in np.array_split(np.arange(chunk.shape[0]), n_parts)]
+
+            for df_obs, df_meas, n_bad_date in pool.imap(_map_chunk, parts):
+                df_obs.to_csv(obs_path, mode="a", header=False, index=False)
+                df_meas.to_csv(meas_path, mode="a", header=False, index=False)
+                stats["observation_rows"] += df_obs.shape[0]
+                stats["measurement_rows"] += df_meas.shape[0]
+                stats["rows_bad_date"] += n_bad_date
+
+            stats["chunks"] += 1
+            stats["rows_in"] += chunk.shape[0]
+            if print_vals: print("Chunk %d: %d rows (%.0f rows/s)" % \
+                (stats["chunks"], chunk.shape[0], chunk.shape[0] / (time.perf_counter() - chunk_start)))
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["rows_per_sec"] = stats["rows_in"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+    if print_vals: print("Processed %d rows in %.1fs (%.0f rows/s)" % (stats["rows_in"], stats["seconds"], stats["rows_per_sec"]))
+    if print_vals and stats["rows_bad_date"]: print("Dropped %d rows with an unparseable exam_datetime" % stats["rows_bad_date"])
+
+    return stats
@@ -0,0 +1,248 @@
+import os
+import re
+import json
+import datetime
+import numpy as np
+import pandas as pd
+from .datamanagement import get_eldef
+from .analysis import combine_exam_element_columns, combine_NAMEMATCH_value_columns, append_sourceel_names, append_sourceval_names, \
+    code_reasons, STATA_VALUE_LABELS
+from .vocab import append_concept_names, append_vocabulary_id
+
+# One pass over the log: reviewer~key pairs, and the marker that starts the flag error section
+ERROR_LOG_PATTERN = re.compile(r"(?P<reviewer>SB|CC)~(?P<key>[\w|#]+)|(?P<marker>\*\*\*FLAG ERRORS\*\*\*)")
+ERROR_LOG_SECTIONS = ["oerr", "flag"]
+
+def iter_error_keys(path):
+    """
+    Stream (reviewer, section, key) tuples from a reviewer error log, one line at a time
+
+    Keys before the "***FLAG ERRORS***" marker are in the "oerr" section, keys after it in
+    the "flag" section (anything after a second marker is ignored, as in the original split).
+    """
+    section = 0
+    with open(path, "r") as err_file:
+        for line in err_file:
+            for match in ERROR_LOG_PATTERN.finditer(line):
+                if match.group("marker"):
+                    section += 1
+                elif section < len(ERROR_LOG_SECTIONS):
+                    yield match.group("reviewer"), ERROR_LOG_SECTIONS[section], match.group("key")
+
+def parse_error_log(path):
+    """
+    Parse a reviewer error log into integer-coded keys
+
+    Arguments:
+        path: str
+            Path to the error log
+
+    Returns:
+        df_errors: pd.DataFrame
+            One row per key occurrence: reviewer ("SB"/"CC"), section ("oerr"/"flag"), key,
+            key_type ("element" for CUIs, "value" for value IDs) and code (element definition
+            position or value ID, -1 if the CUI isn't in the element definitions)
+    """
+    cui_codes = {cui:code for code, cui in enumerate(get_eldef().CUI)}
+
+    reviewers, sections, keys, key_types, codes = [], [], [], [], []
+    for reviewer, section, key in iter_error_keys(path):
+        reviewers.append(reviewer)
+        sections.append(section)
+        keys.append(key)
+        if key.isdigit():
+            key_types.append("value")
+            codes.append(int(key))
+        else:
+            key_types.append("element")
+            codes.append(cui_codes.get(key, -1))
+
+    return pd.DataFrame({"reviewer":reviewers, "section":sections, "key":keys, "key_type":key_types, "code":codes})\
+        .astype({"reviewer":"category", "section":"category", "key":"string", "key_type":"category", "code":"int64"})
+
+def flag_error_rows(df_in, df_errors, reviewer, df_type=None):
+    """
+    Mark the mapping rows that appear in the error log for a reviewer
+
+    Arguments:
+        df_in: pd.DataFrame
+            Mapping DataFrame for the reviewer (e.g. df_el_sb)
+
+        df_errors: pd.DataFrame
+            Output of parse_error_log()
+
+        reviewer: str
+            "SB" or "CC"
+
+        df_type: str
+            'element' or 'value'
+
+    Returns:
+        df_out: pd.DataFrame
+            df_in with boolean flag_error and oerr_error columns
+    """
+    if df_type not in ['element', 'value']:
+        raise ValueError("Invalid/no dataframe type given: please specify \'element\' or \'value\'")
+
+    if df_type == 'element':
+        codes = pd.Index(get_eldef().CUI.astype("object")).get_indexer(df_in.sourceCode.astype("object"))
+    else:
+        codes = df_in.sourceCode.fillna(-1).to_numpy(dtype="int64")
+
+    df_reviewer = df_errors.loc[(df_errors.reviewer == reviewer) & (df_errors.key_type == df_type)]
+
+    df_out = df_in.copy(deep=True)
+    for section in ERROR_LOG_SECTIONS:
+        section_codes = df_reviewer.loc[df_reviewer.section == section].code.unique()
+        df_out[section + "_error"] = np.isin(codes, section_codes) & (codes >= 0)
+    return df_out
+
+def extract_errors(path=r"C:\Users\willh\OneDrive - University of Cambridge\Work\University\Medicine\Elective\1 - OMOP workgroup collab\A - Vocab Mapping\SCREENEDMAPS\ErrorLog.txt"):
+    df_errors = parse_error_log(path)
+
+    out_dict = {}
+    for section in ERROR_LOG_SECTIONS[::-1]:
+        for reviewer in ["SB", "CC"]:
+            out_dict[reviewer.lower() + "_" + section + "_keys"] = \
+                df_errors.loc[(df_errors.reviewer == reviewer) & (df_errors.section == section)].key.tolist()
+
+    with open("Exports/error_keys.txt", "w") as m_file:
+        json.dump(out_dict, m_file)
+
+    return df_errors
+
+def create_outdir():
+    analysis_stamp = str(datetime.datetime.now().date())
+    outdir = "Exports/" + analysis_stamp
+    try:
+        os.mkdir(outdir)
+    except FileExistsError:
+        pass
+
+    try:
+        os.mkdir(outdir + "/Analysis")
+    except FileExistsError:
+        pass
+
+    try:
+        os.mkdir(outdir + "/Analysis/FlagsExpanded")
+    except FileExistsError:
+        pass
+
+    try:
+        os.mkdir(outdir + "/MapCompare")
+    except FileExistsError:
+        pass
+    
+    try:
+        os.mkdir(outdir + "/SSSOM")
+    except FileExistsError:
+        pass
+
+    return outdir
+
+def transform_mapping(dfmap_in, dftype=None):
+    el_column_map = {
+        "sourceCode": "subject_id",
+        "SUBJECT_LABEL" : "subject_label",
+        "equivalence" : "predicate_id",
+        "conceptId" : "object_id",
+        "concept_name" : "object_label",
+        # : "mapping_justification",
+        # : "mapping_date",
+        # : "author_id",
+        # : "subject_source",
+        # : "subject_source_version",
+        # : "object_source",
+        # : "object_source_version",
+        # : "confidence
+    }
+
+    predicate_map = {
+        "EQUAL":"skos:exactMatch",
+        "WIDER":"skos:broadMatch",
+        "NARROWER":"skos:narrowMatch",
+    }
+
+    df_in = dfmap_in.copy(deep=True)
+
+    if (dftype not in ["element", "value"]) or (dftype is None):
+        raise Exception("No/invalid type (element vs value) specified")
+
+    # Create the necessary columns
+    if dftype == "element":
+        # Create the necessary columns
+        df_in = append_concept_names(combine_exam_element_columns(\
+            append_sourceel_names(df_in), combine_column_name="SUBJECT_LABEL"))
+    elif dftype == "value":
+        df_in = append_concept_names(combine_NAMEMATCH_value_columns(\
+            combine_exam_element_columns(append_sourceval_names(df_in)), combine_column_name="SUBJECT_LABEL"))
+        df_in.loc[:,"sourceCode"] = df_in.loc[:,"sourceCode"].astype("string")
+        
+
+    #STEP 1: Rename columns
+    df_in.rename(columns=el_column_map, inplace=True)
+
+    #STEP 2: Convert values
+    df_in.loc[:, "predicate_id"] = df_in.predicate_id.map(predicate_map)
+
+    if dftype == "element":
+        df_in.loc[:, "subject_id"] = "epic.kaleidoscope.common.CUI:" + df_in.subject_id
+    elif dftype == "value":
+        df_in.loc[:, "subject_id"] = "epic.kaleidoscope.common.prepopvalues:" + df_in.subject_id
+
+    df_in.loc[:,"object_id"] = "ohdsi.concept:" + df_in.object_id.astype("string")
+
+    df_in.loc[:,"mapping_justification"] = "semapv:HumanCuration"
+
+    return df_in[\
+        ['subject_id', 'subject_label', 'predicate_id', 'object_id', 'object_label', 'comment', 'mapping_justification']\
+        ].loc[df_in.predicate_id.notna()]
+
+def export_stata(dict_maps, path, reviewers=["cc", "sb", "consensus", "wh"], resource_db_path=r"Resources\resource.db", shared_vocab=None):
+    """
+    Write the reason-coded reviewer data straight to a Stata .dta file
+
+    Replaces the combined Excel export and the relabelling section of Stata/DoFile.do: the
+    written file already has the coded equivalence/reason variables, their value labels, and
+    vocabulary_id_consensus (1 SNOMED, 2 LOINC, 3 RxNorm, 4 Other/None).
+    Write it as Stata/combined_data.dta and run the analysis with "do DoFile.do dta".
+
+    Arguments:
+        dict_maps: dict
+            Maps a reviewer label to its (element mapping, value mapping) DataFrames
+
+        path: str
+            Path of the .dta file to write
+
+        reviewers: list, default ["cc", "sb", "consensus", "wh"]
+            Reviewer labels, as in code_reasons()
+
+        resource_db_path: str, default r"Resources\\resource.db"
+            Path to the sqlite database holding the OMOP concept table
+
+        shared_vocab: SharedVocabulary, default None
+            Use this instead of resource.db for the vocabulary lookup
+
+    Returns:
+        df_coded: pd.DataFrame
+            The data written to the .dta file
+    """
+    df_coded = code_reasons(dict_maps, reviewers=reviewers)
+
+    value_labels = {"type":STATA_VALUE_LABELS["type"]}
+    for x in reviewers:
+        for var in ["equivalence", "equivalence_2", "widerreason", "unmatchedreason"]:
+            value_labels[var + "_" + x] = STATA_VALUE_LABELS[var]
+
+    if "consensus" in reviewers:
+        vocab_codes = {"SNOMED":1, "LOINC":2, "RxNorm":3}
+        concept_ids = pd.Series(df_coded.conceptid_consensus.dropna().unique()).astype("Int64")
+        df_vocab = append_vocabulary_id(pd.DataFrame({"conceptId":concept_ids}), resource_db_path=resource_db_path, shared_vocab=shared_vocab)
+        vocabulary_id = df_coded.conceptid_consensus.map(df_vocab.set_index(df_vocab.conceptId.astype("float")).vocabulary_id)
+        df_coded["vocabulary_id_consensus"] = vocabulary_id.map(vocab_codes).fillna(4).astype("int8")
+        value_labels["vocabulary_id_consensus"] = {code:label for label, code in vocab_codes.items()} | {4:"Other/None"}
+
+    df_coded.to_stata(path, write_index=False, value_labels=value_labels)
+
+    return df_coded
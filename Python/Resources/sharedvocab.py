@@ -0,0 +1,211 @@
+import sys
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory, resource_tracker
+
+VOCAB_COLUMNS = ["concept_id", "concept_code", "concept_name", "vocabulary_id"]
+
+def _attach_block(name):
+    """
+    Open an existing shared memory block without registering it with the resource tracker
+
+    Only the creating process should track (and eventually unlink) a block. From Python 3.13
+    this is SharedMemory(track=False). Before that, attaching always registers the block with
+    the attaching process's tracker: pool workers share the creator's tracker, so a later
+    unregister would remove the creator's own entry, while an unrelated process's tracker would
+    unlink the block when that process exits. So the registration is suppressed for the call.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+
+    register = resource_tracker.register
+    def register_except_shm(name, rtype):
+        if rtype != "shared_memory":
+            register(name, rtype)
+    resource_tracker.register = register_except_shm
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+class SharedVocabulary:
+    """
+    Read-only copy of (a subset of) the OMOP concept table held in shared memory
+
+    The table is stored column-wise, sorted by concept_id, so lookups are a binary search
+    (np.searchsorted) over the concept_id array. Text columns are stored Arrow-style as one
+    utf-8 byte buffer plus an int64 offsets array; low-cardinality columns (vocabulary_id by
+    default) are stored as integer codes (of the smallest int type that fits) plus a category list.
+
+    Create it once in the parent process with SharedVocabulary.create() (or load_shared_vocab()),
+    pass `vocab.handle` to the workers, and call SharedVocabulary.attach(handle) there. Attaching
+    maps the existing buffers without copying them, and leaves freeing them to the creator.
+    """
+
+    def __init__(self, handle, blocks, owner):
+        self.handle = handle
+        self._blocks = blocks
+        self._owner = owner
+        self._arrays = {key:np.ndarray(shape, dtype=dtype, buffer=blocks[key].buf) \
+            for key, (name, dtype, shape) in handle["arrays"].items()}
+        self.concept_id = self._arrays["concept_id"]
+
+    @classmethod
+    def create(cls, df_concept, categorical=["vocabulary_id"]):
+        """
+        Copy a concept DataFrame into shared memory
+
+        Arguments:
+            df_concept: pd.DataFrame
+                Concept records, must include concept_id
+
+            categorical: list, default ["vocabulary_id"]
+                Columns to store as integer codes (all other non-id columns are stored as text)
+
+        Returns:
+            vocab: SharedVocabulary
+        """
+        df = df_concept.sort_values("concept_id", kind="stable").reset_index(drop=True)
+        assert df.concept_id.is_unique
+
+        arrays = {"concept_id": df.concept_id.to_numpy(dtype="int64")}
+        categories = {}
+        strings = []
+        for col in df.columns.drop("concept_id"):
+            if col in categorical:
+                cat = pd.Categorical(df[col])
+                categories[col] = list(cat.categories)
+                arrays[col] = np.asarray(cat.codes)
+            else:
+                encoded = df[col].astype("string").fillna("").str.encode("utf-8")
+                offsets = np.zeros(df.shape[0] + 1, dtype="int64")
+                np.cumsum(encoded.str.len().to_numpy(dtype="int64"), out=offsets[1:])
+                arrays[col + "__offsets"] = offsets
+                arrays[col + "__data"] = np.frombuffer(b"".join(encoded.tolist()), dtype="uint8")
+                strings.append(col)
+
+        handle = {"n":df.shape[0], "arrays":{}, "categories":categories, "strings":strings}
+        blocks = {}
+        try:
+            for key, arr in arrays.items():
+                shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+                np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[:] = arr
+                blocks[key] = shm
+                handle["arrays"][key] = (shm.name, arr.dtype.str, arr.shape)
+        except:
+            for shm in blocks.values():
+                shm.close(); shm.unlink()
+            raise
+
+        return cls(handle, blocks, owner=True)
+
+    @classmethod
+    def attach(cls, handle):
+        """Attach to a SharedVocabulary created in another process, without copying"""
+        blocks = {key:_attach_block(name) for key, (name, dtype, shape) in handle["arrays"].items()}
+        return cls(handle, blocks, owner=False)
+
+    def __len__(self):
+        return self.handle["n"]
+
+    def positions(self, concept_ids):
+        """Row positions of concept_ids in the table (-1 where not found)"""
+        ids = np.asarray(concept_ids, dtype="int64")
+        if len(self.concept_id) == 0:
+            return np.full(ids.shape, -1, dtype="int64")
+        pos = np.searchsorted(self.concept_id, ids)
+        pos[pos >= len(self.concept_id)] = 0
+        return np.where(self.concept_id[pos] == ids, pos, -1)
+
+    def contains(self, concept_ids):
+        return self.positions(concept_ids) >= 0
+
+    def _column(self, col, pos):
+        if col in self.handle["categories"]:
+            cats = np.asarray(self.handle["categories"][col] + [None], dtype="object")
+            codes = self._arrays[col][pos].astype("int64")
+            codes[codes < 0] = len(cats) - 1
+            return pd.array(cats[codes], dtype="string")
+
+        offsets = self._arrays[col + "__offsets"]
+        data = self._arrays[col + "__data"]
+        starts = offsets[pos]
+        ends = offsets[pos + 1]
+        values = [bytes(data[s:e]).decode("utf-8") if e > s else None for s, e in zip(starts, ends)]
+        return pd.array(values, dtype="string")
+
+    def lookup(self, concept_ids, cols=["concept_name"]):
+        """
+        Look up concept attributes by concept_id
+
+        Arguments:
+            concept_ids: list-like
+                concept IDs to look up
+
+            cols: list, default ["concept_name"]
+                Columns to return
+
+        Returns:
+            df_out: pd.DataFrame
+                One row per requested ID (conceptId column, Int64), with nulls where the ID isn't found
+        """
+        ids = np.asarray(concept_ids, dtype="int64")
+        pos = self.positions(ids)
+        found = pos >= 0
+
+        df_out = pd.DataFrame({"conceptId":pd.array(ids, dtype="Int64")})
+        for col in cols:
+            sr_col = pd.Series(pd.NA, index=df_out.index, dtype="string")
+            sr_col.loc[found] = self._column(col, pos[found])
+            df_out[col] = sr_col
+        return df_out
+
+    def close(self):
+        """Detach from the shared buffers. The creating process also frees them"""
+        self._arrays = {}
+        self.concept_id = None
+        for shm in self._blocks.values():
+            shm.close()
+            if self._owner:
+                shm.unlink()
+        self._blocks = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def load_shared_vocab(source="Vocabularies/CONCEPT.csv", vocab=None, cols=VOCAB_COLUMNS, categorical=["vocabulary_id"]):
+    """
+    Load the OMOP concept table once into a SharedVocabulary
+
+    Arguments:
+        source: str, default "Vocabularies/CONCEPT.csv"
+            Path to the OMOP CONCEPT csv (tab-delimited), or to an sqlite database (.db) with a concept table
+
+        vocab: list, default None
+            Vocabularies to include (None for all)
+
+        cols: list, default ["concept_id", "concept_code", "concept_name", "vocabulary_id"]
+            Columns to load
+
+        categorical: list, default ["vocabulary_id"]
+            Columns to store as integer codes
+
+    Returns:
+        vocab: SharedVocabulary
+    """
+    if source.endswith(".db"):
+        import sqlite3
+        sqliteConnection = sqlite3.connect(source)
+        df_concept = pd.read_sql("SELECT %s FROM concept" % ", ".join(cols), con=sqliteConnection)
+        sqliteConnection.close()
+    else:
+        dtype_map = {"concept_code": object, "concept_name": "string", "vocabulary_id":"string", "concept_id":"int64"}
+        df_concept = pd.read_csv(source, delimiter="\t", usecols=cols, dtype={k:v for k, v in dtype_map.items() if k in cols})
+
+    if vocab is not None:
+        df_concept = df_concept.loc[df_concept.vocabulary_id.isin(vocab)]
+
+    return SharedVocabulary.create(df_concept, categorical=categorical)
@@ -0,0 +1,172 @@
+import os
+import datetime
+import importlib.util
+import pandas as pd
+from .analysis import categorize_mapping
+
+# Fields that make up a mapping row, and that the row fingerprint covers
+SNAPSHOT_FIELDS = ["sourceCode", "equivalence", "conceptId", "comment"]
+CATEGORY_FIELDS = ["equivalence", "unmapped", "wider", "n_other", "n_nomatch"]
+
+def normalize_mapping(df_in):
+    """
+    Mapping fields with consistent dtypes, so the same row hashes and compares the same whether
+    or not the sheet it came from had nulls (Excel loads an integer column with nulls as float)
+    """
+    df = df_in[SNAPSHOT_FIELDS].copy(deep=True)
+    if pd.api.types.is_numeric_dtype(df.sourceCode):
+        df["sourceCode"] = df.sourceCode.astype("Int64")
+    return df.astype({"sourceCode":"string", "equivalence":"string", "conceptId":"Int64", "comment":"string"})
+
+def fingerprint_mapping(df_in):
+    """
+    64-bit fingerprint per mapping row over (sourceCode, equivalence, conceptId, comment)
+
+    Arguments:
+        df_in: pd.DataFrame
+            Mapping DataFrame
+
+    Returns:
+        fingerprints: np.ndarray
+            uint64 array aligned to the rows of df_in
+    """
+    return pd.util.hash_pandas_object(normalize_mapping(df_in).astype("string"), index=False).to_numpy()
+
+def summarize_categories(df_cat):
+    """Collapse per-row categories (from categorize_mapping) into the analyze_mapping() dictionary"""
+    dict_out = {}
+    sr_equiv = df_cat.equivalence.value_counts()
+    dict_out["equivalence"] = {equiv:int(sr_equiv.get(equiv, 0)) for equiv in ["EQUAL", "WIDER", "NARROWER", "UNMATCHED"]}
+    dict_out["unmapped"] = {"OTHER":int(df_cat.n_other.sum()), "NOMATCH":int(df_cat.n_nomatch.sum())}
+    sr_wider = df_cat.wider.value_counts()
+    dict_out["wider"] = {flag:int(sr_wider.get(flag, 0)) for flag in ["LATERALITY", "CONCEPTMISSING", "CONCEPTMISSING&LATERALITY"]}
+    return dict_out
+
+def categorize_incremental(df_in, df_type=None, base=None):
+    """
+    Per-row categories for a mapping, only re-running the categorization for rows that changed
+
+    Arguments:
+        df_in: pd.DataFrame
+            Mapping DataFrame (sourceCode, equivalence, conceptId, comment)
+
+        df_type: str
+            'element' or 'value'
+
+        base: pd.DataFrame, default None
+            A previous snapshot (from load_snapshot). Rows whose fingerprint matches a row
+            in the snapshot reuse its categories
+
+    Returns:
+        df_cat: pd.DataFrame
+            Categories aligned to df_in, plus a fingerprint column
+    """
+    fingerprints = fingerprint_mapping(df_in)
+
+    # Snapshots saved before n_other/n_nomatch were added can't be reused
+    if (base is not None) and not set(CATEGORY_FIELDS).issubset(base.columns):
+        base = None
+
+    if base is None:
+        df_cat = categorize_mapping(df_in, df_type=df_type)
+        df_cat["fingerprint"] = fingerprints
+        return df_cat
+
+    # Hash join on the fingerprint to pick up unchanged rows
+    df_base = base[["fingerprint"] + CATEGORY_FIELDS].drop_duplicates("fingerprint").set_index("fingerprint")
+    df_cat = df_base.reindex(fingerprints).set_axis(df_in.index)
+    changed = ~pd.Index(fingerprints).isin(df_base.index)
+
+    if changed.any():
+        df_cat.loc[changed, CATEGORY_FIELDS] = categorize_mapping(df_in.loc[changed], df_type=df_type)[CATEGORY_FIELDS]
+
+    df_cat["fingerprint"] = fingerprints
+    return df_cat.astype({"equivalence":"string", "unmapped":"string", "wider":"string", "n_other":"int64", "n_nomatch":"int64"})
+
+def save_snapshot(df_in, name, df_type=None, label=None, snapdir="Exports/Snapshots", base=None):
+    """
+    Store a mapping set as a Parquet snapshot with per-row fingerprints and categories
+
+    Arguments:
+        df_in: pd.DataFrame
+            Mapping DataFrame (sourceCode, equivalence, conceptId, comment)
+
+        name: str
+            Name of the mapping set, e.g. "CONS elements"
+
+        df_type: str
+            'element' or 'value'
+
+        label: str, default None
+            Snapshot label. Defaults to the current date, as in create_outdir()
+
+        snapdir: str, default "Exports/Snapshots"
+            Root of the snapshot store
+
+        base: pd.DataFrame, default None
+            A previous snapshot of the same mapping set, used to skip re-categorizing unchanged rows
+
+    Returns:
+        path: str
+            Path to the written snapshot
+    """
+    # Check before anything is written, so a failed save doesn't leave an empty label directory
+    if (importlib.util.find_spec("pyarrow") is None) and (importlib.util.find_spec("fastparquet") is None):
+        raise ImportError("save_snapshot() needs a Parquet engine: pip install pyarrow (or fastparquet)")
+
+    if label is None:
+        label = str(datetime.datetime.now().date())
+
+    df_cat = categorize_incremental(df_in, df_type=df_type, base=base)
+    df_snap = df_in[SNAPSHOT_FIELDS].copy(deep=True)
+    df_snap[CATEGORY_FIELDS[1:] + ["fingerprint"]] = df_cat[CATEGORY_FIELDS[1:] + ["fingerprint"]]
+
+    os.makedirs(os.path.join(snapdir, label), exist_ok=True)
+    path = os.path.join(snapdir, label, name.replace(" ", "_") + ".parquet")
+    df_snap.to_parquet(path, index=False)
+    return path
+
+def load_snapshot(name, label, snapdir="Exports/Snapshots"):
+    return pd.read_parquet(os.path.join(snapdir, label, name.replace(" ", "_") + ".parquet"))
+
+def list_snapshots(snapdir="Exports/Snapshots"):
+    """Lists the snapshot labels in the store (those holding at least one snapshot), oldest first"""
+    if not os.path.isdir(snapdir):
+        return []
+    return sorted(label for label in os.listdir(snapdir) if os.path.isdir(os.path.join(snapdir, label)) \
+        and any(f.endswith(".parquet") for f in os.listdir(os.path.join(snapdir, label))))
+
+def diff_snapshots(df_old, df_new):
+    """
+    Diff two versions of a mapping set
+
+    Rows are joined on sourceCode (a single hash join), and only rows whose fingerprints
+    differ are compared field by field.
+
+    Arguments:
+        df_old: pd.DataFrame
+            Earlier snapshot (or mapping DataFrame)
+
+        df_new: pd.DataFrame
+            Later snapshot (or mapping DataFrame)
+
+    Returns:
+        df_diff: pd.DataFrame
+            One row per added, removed or changed sourceCode, with a "change" column, the old
+            and new field values (suffixed _old/_new), and a boolean "<field>_changed" column per field
+    """
+    df_old = normalize_mapping(df_old).assign(fingerprint=fingerprint_mapping(df_old))
+    df_new = normalize_mapping(df_new).assign(fingerprint=fingerprint_mapping(df_new))
+    assert df_old.sourceCode.is_unique and df_new.sourceCode.is_unique
+
+    df_join = df_old.merge(df_new, on="sourceCode", how="outer", suffixes=("_old", "_new"), indicator=True)
+    df_join = df_join.loc[df_join._merge.ne("both") | df_join.fingerprint_old.ne(df_join.fingerprint_new)]
+
+    df_join["change"] = df_join._merge.map({"left_only":"removed", "right_only":"added", "both":"changed"}).astype("string")
+
+    for field in SNAPSHOT_FIELDS[1:]:
+        old = df_join[field + "_old"].astype("string")
+        new = df_join[field + "_new"].astype("string")
+        df_join[field + "_changed"] = (df_join.change == "changed") & ~((old == new).fillna(False) | (old.isna() & new.isna()))
+
+    return df_join.drop(columns=["_merge", "fingerprint_old", "fingerprint_new"]).reset_index(drop=True)
@@ -0,0 +1,236 @@
+import numpy as np
+import pandas as pd
+from .datamanagement import get_eldef, get_valdef
+from .analysis import get_flag_matrix
+
+EQUIVALENCE_VALUES = ["EQUAL", "WIDER", "NARROWER", "UNMATCHED"]
+UNMATCHED_FLAGS = ["NOMATCH", "VALSMAPPED", "INDIRECT", "SUBFIELD"]
+WIDER_FLAGS = ["LATERALITY", "CONCEPTMISSING"]
+
+VIOLATION_COLUMNS = ["sheet", "row", "sourceCode", "rule", "detail"]
+
+def get_concept_status(concept_ids, resource_db_path=r"Resources\resource.db", shared_vocab=None):
+    """
+    Get standard_concept and invalid_reason for a list of concept IDs
+
+    Arguments:
+        concept_ids: list-like
+            The concept IDs to look up
+
+        resource_db_path: str, default r"Resources\\resource.db"
+            Path to the sqlite database holding the OMOP concept table
+
+        shared_vocab: SharedVocabulary, default None
+            Use this instead of resource.db. Must have been loaded with the
+            standard_concept and invalid_reason columns
+
+    Returns:
+        df_status: pd.DataFrame
+            concept_id, standard_concept, invalid_reason for the IDs found in the concept table
+    """
+    ids = pd.unique(np.asarray(concept_ids, dtype="int64"))
+
+    if shared_vocab is not None:
+        df_status = shared_vocab.lookup(ids, cols=["standard_concept", "invalid_reason"])\
+            .rename(columns={"conceptId":"concept_id"})
+        return df_status.loc[shared_vocab.contains(ids)].astype({"concept_id":"int64"})
+
+    import sqlite3
+
+    sqliteConnection = sqlite3.connect(resource_db_path)
+    cursor = sqliteConnection.cursor()
+
+    pd.DataFrame({"conceptId":ids}).to_sql(name="concept_id_temp_table", con=sqliteConnection, if_exists="replace", index=False)
+
+    m_query = """
+    SELECT concept_id, standard_concept, invalid_reason
+    FROM concept
+    WHERE concept_id IN (SELECT conceptId FROM concept_id_temp_table)
+    """
+    df_status = pd.read_sql(m_query, con=sqliteConnection)\
+        .astype({"concept_id":"int64", "standard_concept":"string", "invalid_reason":"string"})
+
+    cursor.execute("DROP TABLE concept_id_temp_table")
+    sqliteConnection.close()
+
+    return df_status
+
+def validate_mapping(df_in, df_type=None, sheet=None, concept_status=None, resource_db_path=r"Resources\resource.db", shared_vocab=None, exclusion_terms=["LOINC"]):
+    """
+    Check a mapping sheet against every validation rule and report all violations
+
+    Rules (one row in the report per failing row and rule):
+        equivalence     equivalence is one of EQUAL, WIDER, NARROWER, UNMATCHED
+        unmatched_flag  UNMATCHED rows have at least one of NOMATCH, VALSMAPPED, INDIRECT, SUBFIELD
+        wider_flag      WIDER rows have LATERALITY and/or CONCEPTMISSING
+        flag_equivalence  UNMATCHED flags only on UNMATCHED rows, WIDER flags only on WIDER rows
+        conceptId_null  conceptId is present
+        concept_exists  conceptId (for EQUAL/WIDER/NARROWER rows) is in the concept table
+        standard        conceptId is a standard concept (standard_concept == "S")
+        deprecated      conceptId has no invalid_reason
+        sourceCode      sourceCode is in the element/value definitions, and appears once
+
+    Arguments:
+        df_in: pd.DataFrame
+            Mapping DataFrame (sourceCode, equivalence, conceptId, comment)
+
+        df_type: str
+            'element' or 'value'
+
+        sheet: str, default None
+            Label for this sheet in the report (e.g. "SB elements")
+
+        concept_status: pd.DataFrame, default None
+            Output of get_concept_status(). Looked up from resource.db (or shared_vocab) if not given
+
+        resource_db_path: str, default r"Resources\\resource.db"
+            Path to the sqlite database holding the OMOP concept table
+
+        shared_vocab: SharedVocabulary, default None
+            Use this instead of resource.db for the concept lookups
+
+        exclusion_terms: list, default ["LOINC"]
+            Upper-case terms in the comments that are not flags
+
+    Returns:
+        df_violations: pd.DataFrame
+            One row per violation (sheet, row, sourceCode, rule, detail). Empty if the sheet is valid
+    """
+    if df_type not in ['element', 'value']:
+        raise ValueError("Invalid/no dataframe type given: please specify \'element\' or \'value\'")
+
+    equivalence = df_in.equivalence.astype("string")
+    conceptId = df_in.conceptId.astype("Int64")
+
+    df_flags = get_flag_matrix(df_in, exclusion_terms=exclusion_terms)\
+        .reindex(columns=UNMATCHED_FLAGS + WIDER_FLAGS, fill_value=0)
+    n_unmatched_flags = df_flags[UNMATCHED_FLAGS].sum(axis=1).to_numpy()
+    n_wider_flags = df_flags[WIDER_FLAGS].sum(axis=1).to_numpy()
+
+    is_unmatched = (equivalence == "UNMATCHED").fillna(False).to_numpy(dtype="bool")
+    is_wider = (equivalence == "WIDER").fillna(False).to_numpy(dtype="bool")
+    is_mapped = equivalence.isin(["EQUAL", "WIDER", "NARROWER"]).to_numpy(dtype="bool")
+    has_concept = conceptId.notna().to_numpy(dtype="bool")
+
+    # Concept table lookups, done once for every conceptId in the sheet
+    if concept_status is None:
+        concept_status = get_concept_status(conceptId.dropna(), resource_db_path=resource_db_path, shared_vocab=shared_vocab)
+    df_status = concept_status.drop_duplicates("concept_id").set_index("concept_id")\
+        .reindex(conceptId.fillna(-1).to_numpy(dtype="int64"))
+    concept_exists = df_status.index.isin(concept_status.concept_id)
+    is_standard = (df_status.standard_concept == "S").fillna(False).to_numpy(dtype="bool")
+    is_deprecated = df_status.invalid_reason.notna().to_numpy(dtype="bool")
+
+    # Source definitions
+    if df_type == 'element':
+        source_codes = get_eldef().CUI
+        in_definitions = df_in.sourceCode.astype("string").isin(source_codes).to_numpy(dtype="bool")
+    else:
+        source_codes = get_valdef().ID
+        in_definitions = df_in.sourceCode.astype("Int64").isin(source_codes).to_numpy(dtype="bool")
+    is_duplicate = df_in.sourceCode.duplicated(keep=False).to_numpy(dtype="bool")
+
+    checks = [
+        ("equivalence", ~equivalence.isin(EQUIVALENCE_VALUES).to_numpy(dtype="bool"),
+            "equivalence is \"" + equivalence.fillna("<null>") + "\""),
+        ("unmatched_flag", is_unmatched & (n_unmatched_flags == 0),
+            "no NOMATCH/VALSMAPPED/INDIRECT/SUBFIELD flag"),
+        ("wider_flag", is_wider & (n_wider_flags == 0),
+            "no LATERALITY/CONCEPTMISSING flag"),
+        ("flag_equivalence", (~is_unmatched & (n_unmatched_flags > 0)) | (~is_wider & (n_wider_flags > 0)),
+            "flags don't match equivalence \"" + equivalence.fillna("<null>") + "\""),
+        ("conceptId_null", ~has_concept,
+            "conceptId is null"),
+        ("concept_exists", is_mapped & has_concept & ~concept_exists,
+            "conceptId " + conceptId.astype("string") + " not in concept table"),
+        ("standard", is_mapped & concept_exists & ~is_standard,
+            "conceptId " + conceptId.astype("string") + " is not a standard concept"),
+        ("deprecated", is_mapped & concept_exists & is_deprecated,
+            "conceptId " + conceptId.astype("string") + " has invalid_reason \"" \
+                + pd.Series(df_status.invalid_reason.to_numpy(), index=df_in.index).astype("string").fillna("") + "\""),
+        ("sourceCode", ~in_definitions | is_duplicate,
+            np.where(is_duplicate, "sourceCode is duplicated", "sourceCode not in definitions")),
+    ]
+
+    df_list = []
+    for rule, failed, detail in checks:
+        if not failed.any():
+            continue
+        detail = pd.Series(detail, index=df_in.index)
+        df_list.append(pd.DataFrame({
+            "sheet": sheet,
+            "row": df_in.index[failed],
+            "sourceCode": df_in.sourceCode[failed].astype("string").to_numpy(),
+            "rule": rule,
+            "detail": detail[failed].astype("string").to_numpy()
+        }))
+
+    if not df_list:
+        return pd.DataFrame(columns=VIOLATION_COLUMNS)
+    return pd.concat(df_list, ignore_index=True)[VIOLATION_COLUMNS]\
+        .sort_values(["row", "rule"], kind="stable").reset_index(drop=True)
+
+def validate_mappings(dict_maps, resource_db_path=r"Resources\resource.db", shared_vocab=None, print_vals=True):
+    """
+    Validate several reviewer sheets with a single concept table lookup
+
+    As well as the validate_mapping() rules, each sheet is checked row-by-row against the first
+    sheet of the same type (rule "aligned"), replacing verify_sourceCode_aligned()
+
+    Arguments:
+        dict_maps: dict
+            Maps a sheet label to (mapping DataFrame, 'element' or 'value'),
+            e.g. {"SB elements":(df_el_sb, 'element'), "SB values":(df_val_sb, 'value')}
+
+        resource_db_path: str, default r"Resources\\resource.db"
+            Path to the sqlite database holding the OMOP concept table
+
+        shared_vocab: SharedVocabulary, default None
+            Use this instead of resource.db for the concept lookups
+
+        print_vals: bool, default True
+            Print the number of violations per sheet
+
+    Returns:
+        df_violations: pd.DataFrame
+            All violations across the sheets
+    """
+    all_ids = pd.concat([df.conceptId.dropna().astype("int64") for df, _ in dict_maps.values()])
+    concept_status = get_concept_status(all_ids, resource_db_path=resource_db_path, shared_vocab=shared_vocab)
+
+    df_list = []
+    reference = {}
+    for sheet, (df, df_type) in dict_maps.items():
+        df_violations = validate_mapping(df, df_type=df_type, sheet=sheet, concept_status=concept_status)
+
+        # Row alignment against the first sheet of the same type (as verify_sourceCode_aligned)
+        if df_type not in reference:
+            reference[df_type] = (sheet, df)
+        else:
+            ref_sheet, df_ref = reference[df_type]
+            ref_codes = df_ref.sourceCode.astype("string").reset_index(drop=True)
+            codes = df.sourceCode.astype("string").reset_index(drop=True)
+            misaligned = ~(codes == ref_codes.reindex(codes.index)).fillna(False).to_numpy(dtype="bool")
+            df_aligned = [df_violations]
+            if misaligned.any():
+                df_aligned.append(pd.DataFrame({
+                    "sheet": sheet,
+                    "row": df.index[misaligned],
+                    "sourceCode": codes[misaligned].to_numpy(),
+                    "rule": "aligned",
+                    "detail": "sourceCode differs from row in " + ref_sheet
+                }))
+            # Sheet-level violation when the lengths differ (covers reference rows missing from this sheet)
+            if df.shape[0] != df_ref.shape[0]:
+                df_aligned.append(pd.DataFrame({
+                    "sheet": [sheet],
+                    "row": [pd.NA],
+                    "sourceCode": [pd.NA],
+                    "rule": "aligned",
+                    "detail": "%d rows, %s has %d rows" % (df.shape[0], ref_sheet, df_ref.shape[0])
+                }))
+            df_violations = pd.concat(df_aligned, ignore_index=True)
+        if print_vals: print("%s: %d violation(s)" % (sheet, df_violations.shape[0]))
+        df_list.append(df_violations)
+
+    return pd.concat(df_list, ignore_index=True)
@@ -0,0 +1,171 @@
+import sqlite3
+import pandas as pd
+
+def get_vocab_ids(vocab=["SNOMED"], cols=["concept_code", "concept_name", "vocabulary_id", "concept_id"], path_to_CONCEPT="Vocabularies/CONCEPT.csv"):
+    """
+    Get subset of records in the OMOP concept table
+
+    Arguments:
+        
+        vocab: list, default ["SNOMED"]
+            The list of vocabularies you want to incldue
+
+        cols: list, default ["concept_code", "concept_name", "vocabulary_id", "concept_id"]
+            The list of columns you want from the concept table
+
+        path_to_CONCEPT: str, default "Vocabularies/CONCEPT.csv"
+            Path to the OMOP CONCEPT csv table
+
+    Returns:
+        df_concept: pandas.Dataframe
+            pandas DataFrame containing the records requested
+    """
+    dtype_map = {"concept_code": object, "concept_name": "string", "vocabulary_id":"string", "concept_id":"int64"}
+    df_all_concepts = pd.read_csv(path_to_CONCEPT, delimiter="\t", usecols=cols, dtype=dtype_map)
+    df_concept = df_all_concepts.loc[df_all_concepts.vocabulary_id.isin(vocab)]
+    del df_all_concepts
+    return df_concept
+
+def get_list_from_column(cur, table, column):
+    cur.row_factory = lambda cursor, row: row[0]
+    sql_query = "SELECT %s FROM %s""" % (column, table)
+    m_list = cur.execute(sql_query).fetchall()
+    cur.row_factory = None
+    return m_list
+
+def append_concept_names(df_in: pd.DataFrame, conceptid_colname="conceptId", resource_db_path=r"Resources\resource.db", shared_vocab=None):
+    df = df_in.copy(deep=True)
+
+    # Rename conceptId columns and drop null values
+    df.rename(columns={conceptid_colname:"conceptId"}, inplace=True)
+
+    if (df.conceptId.isna().any()):
+        raise Exception("Null value found in ConceptID field")
+
+    # Use the shared-memory vocabulary (Resources.sharedvocab.SharedVocabulary) in place of resource.db, if given
+    if shared_vocab is not None:
+        expanded_names = shared_vocab.lookup(df.conceptId.unique(), cols=["concept_name"])
+        return df.merge(expanded_names, on="conceptId", how="left")
+
+    sqliteConnection = sqlite3.connect(resource_db_path)
+    cursor = sqliteConnection.cursor()
+
+    # Write this to a temporary table
+    df.to_sql(name="concept_id_temp_table", con=sqliteConnection, if_exists="replace", index=False)
+
+    # Extract the names for these conceptId values
+    m_query = """
+    WITH valid_list AS (
+        SELECT conceptId
+        FROM concept_id_temp_table
+    ), concept_data AS (
+        SELECT concept_id, concept_name
+        FROM concept
+        WHERE concept_id IN valid_list
+    )
+    SELECT DISTINCT valid_list.conceptId, concept_data.concept_name
+    FROM valid_list
+    LEFT JOIN concept_data ON valid_list.conceptId=concept_data.concept_id
+    """
+    expanded_names = pd.read_sql(m_query, con=sqliteConnection).astype({"conceptId":"Int64"})
+
+    # return expanded_names
+
+    assert expanded_names.conceptId.is_unique
+    
+    cursor.execute("DROP TABLE concept_id_temp_table")
+    sqliteConnection.close()
+
+    return df.merge(expanded_names, on="conceptId", how="left")
+
+def append_sourceconcept_id(df_in: pd.DataFrame, conceptid_colname="conceptId", resource_db_path=r"Resources\resource.db", shared_vocab=None):
+    df = df_in.copy(deep=True)
+
+    # Rename conceptId columns and drop null values
+    df.rename(columns={conceptid_colname:"conceptId"}, inplace=True)
+
+    if (df.conceptId.isna().any()):
+        raise Exception("Null value found in conceptId field")
+
+    # Use the shared-memory vocabulary (Resources.sharedvocab.SharedVocabulary) in place of resource.db, if given
+    if shared_vocab is not None:
+        expanded_names = shared_vocab.lookup(df.conceptId.unique(), cols=["concept_code"])
+        return df.merge(expanded_names, on="conceptId", how="left")
+
+    sqliteConnection = sqlite3.connect(resource_db_path)
+    cursor = sqliteConnection.cursor()
+
+    # Write this to a temporary table
+    df.to_sql(name="concept_id_temp_table", con=sqliteConnection, if_exists="replace", index=False)
+
+    # Extract the names for these conceptId values
+    m_query = """
+    WITH valid_list AS (
+        SELECT conceptId
+        FROM concept_id_temp_table
+    ), concept_data AS (
+        SELECT concept_id, vocabulary_id, concept_code
+        FROM concept
+        WHERE concept_id IN valid_list
+    )
+    SELECT DISTINCT valid_list.conceptId, concept_data.concept_code
+    FROM valid_list
+    LEFT JOIN concept_data ON valid_list.conceptId=concept_data.concept_id
+    """
+
+    expanded_names = pd.read_sql(m_query, con=sqliteConnection).astype({"conceptId":"Int64"})
+
+    # return expanded_names
+
+    assert expanded_names.conceptId.is_unique
+    
+    cursor.execute("DROP TABLE concept_id_temp_table")
+    sqliteConnection.close()
+
+    return df.merge(expanded_names, on="conceptId", how="left")
+
+def append_vocabulary_id(df_in: pd.DataFrame, conceptid_colname="conceptId", resource_db_path=r"Resources\resource.db", shared_vocab=None):
+    df = df_in.copy(deep=True)
+
+    # Rename conceptId columns and drop null values
+    df.rename(columns={conceptid_colname:"conceptId"}, inplace=True)
+
+    if (df.conceptId.isna().any()):
+        raise Exception("Null value found in conceptId field")
+
+    # Use the shared-memory vocabulary (Resources.sharedvocab.SharedVocabulary) in place of resource.db, if given
+    if shared_vocab is not None:
+        expanded_names = shared_vocab.lookup(df.conceptId.unique(), cols=["vocabulary_id"])
+        return df.merge(expanded_names, on="conceptId", how="left")
+
+    sqliteConnection = sqlite3.connect(resource_db_path)
+    cursor = sqliteConnection.cursor()
+
+    # Write this to a temporary table
+    df.to_sql(name="concept_id_temp_table", con=sqliteConnection, if_exists="replace", index=False)
+
+    # Extract the names for these conceptId values
+    m_query = """
+    WITH valid_list AS (
+        SELECT conceptId
+        FROM concept_id_temp_table
+    ), concept_data AS (
+        SELECT concept_id, vocabulary_id
+        FROM concept
+        WHERE concept_id IN valid_list
+    )
+    SELECT DISTINCT valid_list.conceptId, concept_data.vocabulary_id
+    FROM valid_list
+    LEFT JOIN concept_data ON valid_list.conceptId=concept_data.concept_id
+    """
+
+    expanded_names = pd.read_sql(m_query, con=sqliteConnection).astype({"conceptId":"Int64"})
+
+    # return expanded_names
+
+    assert expanded_names.conceptId.is_unique
+    
+    cursor.execute("DROP TABLE concept_id_temp_table")
+    sqliteConnection.close()
+
+    return df.merge(expanded_names, on="conceptId", how="left")
@@ -0,0 +1,73 @@
+"""
+Import-time benchmark for the Resources package
+
+Each import is timed in a fresh interpreter (best of several runs) and checked against a
+startup budget. Run from the Python/ directory:
+
+    python benchmark_imports.py
+
+Exits with status 1 if any import is over budget, or pulls in a dependency it shouldn't.
+"""
+import sys
+import json
+import subprocess
+
+# Budget in milliseconds, and modules that must NOT be loaded as a side effect
+BUDGETS = {
+    "Resources": (25, ["pandas", "numpy", "cryptography", "sqlite3"]),
+    "Resources.datamanagement": (1500, ["cryptography"]),
+    "Resources.analysis": (1500, ["cryptography"]),
+    "Resources.vocab": (1500, ["cryptography"]),
+    "Resources.export": (1500, ["cryptography"]),
+    "Resources.crypto": (1000, ["pandas"]),
+    "Resources.etl": (1500, ["cryptography"]),
+    "Resources.coverage": (1500, ["cryptography"]),
+    "Resources.snapshots": (1500, ["cryptography"]),
+    "Resources.sharedvocab": (1500, ["cryptography"]),
+    "Resources.validation": (1500, ["cryptography"]),
+}
+N_RUNS = 5
+
+TIMER = """
+import sys, time, json
+start = time.perf_counter()
+import %s
+elapsed = time.perf_counter() - start
+print(json.dumps({"ms": elapsed * 1000, "modules": sorted(m.split(".")[0] for m in sys.modules)}))
+"""
+
+def time_import(module, n_runs=N_RUNS):
+    """Returns the best import time (ms) over n_runs fresh interpreters, and the modules loaded"""
+    best = None
+    for _ in range(n_runs):
+        out = subprocess.run([sys.executable, "-c", TIMER % module], capture_output=True, text=True, check=True)
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        if (best is None) or (result["ms"] < best["ms"]):
+            best = result
+    return best["ms"], set(best["modules"])
+
+def main():
+    failed = False
+    print("%-28s %10s %10s  %s" % ("module", "time (ms)", "budget", "status"))
+    for module, (budget, forbidden) in BUDGETS.items():
+        try:
+            elapsed, loaded = time_import(module)
+        except subprocess.CalledProcessError as err:
+            print("%-28s %10s %10d  IMPORT FAILED\n%s" % (module, "-", budget, err.stderr))
+            failed = True
+            continue
+
+        status = "OK"
+        if elapsed > budget:
+            status = "OVER BUDGET"
+        leaked = sorted(set(forbidden) & loaded)
+        if leaked:
+            status = "LOADED " + ", ".join(leaked)
+        if status != "OK":
+            failed = True
+        print("%-28s %10.1f %10d  %s" % (module, elapsed, budget, status))
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
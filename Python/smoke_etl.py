@@ -0,0 +1,82 @@
+"""
+Smoke check for the Epic-to-OMOP ETL stage (Resources.etl)
+
+Builds a small synthetic element definition table, concept table and exam record set in a
+temporary directory, then runs the default compile_mapping_lookup() path (domains looked up
+in resource.db) and run_etl() through a worker pool. Run from the Python/ directory:
+
+    python smoke_etl.py
+
+Some records have an unparseable exam_datetime, which run_etl() should drop and count.
+Exits with status 1 if the ETL fails or emits the wrong number of rows.
+"""
+import os
+import sys
+import sqlite3
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+from Resources.etl import compile_mapping_lookup, run_etl
+
+N_RECORDS = 20000
+N_BAD_DATE = 20
+
+def build_fixtures(workdir):
+    """Writes the element definitions and resource.db, and returns the element/value maps"""
+    os.makedirs(os.path.join(workdir, "Resources", "__ReadOnly"))
+    cuis = ["EPIC#EXAMPLECODE%d" % i for i in range(1, 5)]
+    pd.DataFrame({"examArea":"Visual Acuity", "dataElement":["Example element %d" % i for i in range(1, 5)], "CUI":cuis})\
+        .to_csv(os.path.join(workdir, "Resources", "__ReadOnly", "__ElementDefinitions.csv"), index=False)
+
+    resource_db_path = os.path.join(workdir, "resource.db")
+    sqliteConnection = sqlite3.connect(resource_db_path)
+    pd.DataFrame({"concept_id":[100, 200, 300, 400], "domain_id":["Observation", "Measurement", "Observation", "Meas Value"]})\
+        .to_sql(name="concept", con=sqliteConnection, index=False)
+    sqliteConnection.close()
+
+    # Two mapped elements, one UNMATCHED and one missing from the map entirely
+    df_el_map = pd.DataFrame({"sourceCode":cuis[:3], "equivalence":["EQUAL", "WIDER", "UNMATCHED"], "conceptId":[100, 200, 0]})\
+        .astype({"sourceCode":"string", "equivalence":"string", "conceptId":"Int64"})
+    df_val_map = pd.DataFrame({"sourceCode":[0, 1, 2], "equivalence":["EQUAL", "UNMATCHED", "EQUAL"], "conceptId":[300, 0, 400]})\
+        .astype({"sourceCode":"Int64", "equivalence":"string", "conceptId":"Int64"})
+
+    return cuis, resource_db_path, df_el_map, df_val_map
+
+def make_chunks(cuis, n_records=N_RECORDS, chunksize=6000):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "person_id": rng.integers(1, 500, n_records),
+        "exam_datetime": "2022-07-29 10:00:00",
+        "CUI": rng.choice(cuis + ["EPIC#UNKNOWN"], n_records),
+        "value_id": pd.array(rng.choice([0, 1, 2, 5, -1], n_records), dtype="Int64"),
+        "value": rng.choice(["20/20", "1.5", "Normal"], n_records),
+    })
+    df.loc[df.value_id < 0, "value_id"] = pd.NA
+    df.loc[df.index[7::n_records // N_BAD_DATE], "exam_datetime"] = "bad"
+    for start in range(0, n_records, chunksize):
+        yield df.iloc[start:start + chunksize]
+
+def main():
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            cuis, resource_db_path, df_el_map, df_val_map = build_fixtures(workdir)
+            lookup = compile_mapping_lookup(df_el_map, df_val_map, resource_db_path=resource_db_path)
+            stats = run_etl(make_chunks(cuis), lookup, os.path.join(workdir, "OMOP"), n_workers=2)
+
+            n_obs = pd.read_csv(os.path.join(workdir, "OMOP", "OBSERVATION.csv")).shape[0]
+            n_meas = pd.read_csv(os.path.join(workdir, "OMOP", "MEASUREMENT.csv")).shape[0]
+        finally:
+            os.chdir(cwd)
+
+    ok = (stats["rows_in"] == N_RECORDS) and (stats["rows_bad_date"] == N_BAD_DATE) \
+        and (n_obs + n_meas == N_RECORDS - N_BAD_DATE) and (n_meas > 0) and (stats["rows_per_sec"] > 0)
+    print("OBSERVATION rows: %d, MEASUREMENT rows: %d -> %s" % (n_obs, n_meas, "OK" if ok else "FAILED"))
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())